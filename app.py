@@ -1,6 +1,15 @@
 from flask import Flask, redirect, render_template, request, make_response, session, abort, jsonify, url_for
+from flask.json.provider import JSONProvider, DefaultJSONProvider
+import orjson
 import secrets
-from functools import wraps
+import hashlib
+import threading
+import time
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from functools import wraps, lru_cache, cache
 import firebase_admin
 from firebase_admin import credentials, firestore, auth
 from datetime import timedelta
@@ -8,24 +17,92 @@ import os
 from dotenv import load_dotenv
 from music_processor import MusicProcessor, format_stem_name, get_instrument_emoji
 import tempfile
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from werkzeug.utils import secure_filename
+from celery import Celery
+from celery.signals import after_setup_logger
+from cachetools import TTLCache
 
 load_dotenv()
 
 # Set working directory to script directory
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
+class ORJSONProvider(JSONProvider):
+    """Serialize jsonify() responses with orjson, falling back to Flask's defaults for other types"""
+    
+    def dumps(self, obj, **kwargs):
+        # Sorted keys like Flask's default provider, so equal payloads serialize (and ETag) identically
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=orjson.OPT_SORT_KEYS).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 app.secret_key = os.getenv('SECRET_KEY')
 
+# Logging goes through a queue so request threads never block on stdout
+log_queue = queue.Queue(-1)
+log_handler = logging.StreamHandler()
+log_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+log_listener = QueueListener(log_queue, log_handler)
+log_listener.start()
+atexit.register(log_listener.stop)  # Flush queued records on shutdown
+
+logger = logging.getLogger('app')
+logger.setLevel(logging.INFO)
+log_queue_handler = QueueHandler(log_queue)
+logger.addHandler(log_queue_handler)
+logger.propagate = False
+
 # Audio upload configuration
-ALLOWED_EXTENSIONS = {'mp3', 'wav', 'flac', 'ogg', 'm4a'}
+ALLOWED_EXTENSIONS = frozenset({'mp3', 'wav', 'flac', 'ogg', 'm4a'})
+ALLOWED_EXTENSIONS_STR = ', '.join(sorted(ALLOWED_EXTENSIONS))
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
+# Where uploads wait for processing (defaults to the OS temp dir). Can point at a tmpfs like
+# /dev/shm, but it must be visible to the Celery worker and sized for concurrent queued uploads.
+UPLOAD_TMP_DIR = os.getenv('UPLOAD_TMP_DIR') or None
+
+
+# Threads for Firestore calls that overlap with other request work
+io_executor = ThreadPoolExecutor(max_workers=8)
+
+# Projects shown per page on /projects
+PROJECTS_PAGE_SIZE = 50
+
 # Initialize music processor
 music_processor = MusicProcessor()
 
+# Celery setup for background audio processing
+# Run a worker with: celery -A app.celery worker --loglevel=info
+# Without CELERY_BROKER_URL there is no worker to hand off to, so tasks run in-process during the request
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL')
+celery = Celery(
+    app.import_name,
+    broker=CELERY_BROKER_URL or 'memory://',
+    backend=os.getenv('CELERY_RESULT_BACKEND', CELERY_BROKER_URL)
+)
+celery.conf.task_always_eager = not CELERY_BROKER_URL
+
+# In-process separations already use every core and can hold several GB of spectrograms,
+# so without a worker only one runs at a time per web process, other uploads wait their turn
+_inprocess_processing = threading.BoundedSemaphore(1)
+
+
+@after_setup_logger.connect
+def use_celery_logging(**kwargs):
+    """In Celery workers log through Celery's handlers, the queue listener thread doesn't survive the fork into pool processes"""
+    if log_queue_handler in logger.handlers:
+        logger.removeHandler(log_queue_handler)
+        log_listener.stop()
+        atexit.unregister(log_listener.stop)
+    logger.propagate = True
+
 
 # Configure session cookie settings
 app.config['SESSION_COOKIE_SECURE'] = True# Ensure cookies are sent over HTTPS
@@ -39,22 +116,141 @@ app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'  # Can be 'Strict', 'Lax', or 'Non
 import json
 import base64
 
-# Check if Firebase config is in environment variable (Vercel) or file (local)
-firebase_json = os.getenv('FIREBASE_CONFIG_JSON')
-if firebase_json:
-    # Decode base64 from environment variable
-    try:
-        firebase_config = json.loads(base64.b64decode(firebase_json).decode('utf-8'))
-        cred = credentials.Certificate(firebase_config)
-    except Exception as e:
-        print(f"Error loading Firebase config from env: {e}")
-        cred = credentials.Certificate("firebase-auth.json")
-else:
-    # Load from local file
-    cred = credentials.Certificate("firebase-auth.json")
+_firebase_lock = threading.Lock()
+
+
+def init_firebase():
+    """Initialize the Firebase Admin SDK on first use, keeping it out of cold-start import time"""
+    with _firebase_lock:
+        try:
+            return firebase_admin.get_app()
+        except ValueError:
+            pass
+        
+        # Check if Firebase config is in environment variable (Vercel) or file (local)
+        firebase_json = os.getenv('FIREBASE_CONFIG_JSON')
+        if firebase_json:
+            # Decode base64 from environment variable
+            try:
+                firebase_config = json.loads(base64.b64decode(firebase_json).decode('utf-8'))
+                cred = credentials.Certificate(firebase_config)
+            except Exception as e:
+                logger.exception("Error loading Firebase config from env: %s", e)
+                cred = credentials.Certificate("firebase-auth.json")
+        else:
+            # Load from local file
+            cred = credentials.Certificate("firebase-auth.json")
+        
+        return firebase_admin.initialize_app(cred)
+
+
+@cache
+def get_db():
+    """Shared Firestore client"""
+    init_firebase()
+    return firestore.client()
+
+
+@lru_cache(maxsize=1024)
+def user_projects_ref(user_id):
+    """The user's projects collection, users/{user_id}/projects"""
+    return get_db().collection('users').document(user_id).collection('projects')
+
+
+# Marks a stats doc whose counters were rebuilt from the projects, not just incremented
+STATS_VERSION = 1
+
+
+def user_stats_ref(user_id):
+    """Summary counters for the dashboard, kept in users/{user_id}/meta/stats"""
+    return get_db().collection('users').document(user_id).collection('meta').document('stats')
 
-firebase_admin.initialize_app(cred)
-db = firestore.client()
+
+def project_name_ref(user_id, project_name):
+    """Reservation doc that makes a project name unique per user, in users/{user_id}/project_names"""
+    # Hash the name so any characters (including '/') make a valid document ID
+    name_id = hashlib.sha256(project_name.encode()).hexdigest()
+    return get_db().collection('users').document(user_id).collection('project_names').document(name_id)
+
+
+def project_name_taken(user_id, project_name, project_id, transaction):
+    """Whether another of the user's projects already has this name, read within the transaction"""
+    name_doc = project_name_ref(user_id, project_name).get(transaction=transaction)
+    if name_doc.exists:
+        return name_doc.get('project_id') != project_id
+    
+    # Projects created before name reservations have none, so fall back to looking the name up
+    query = user_projects_ref(user_id).where('name', '==', project_name).select(['name']).limit(2)
+    return any(doc.id != project_id for doc in query.stream(transaction=transaction))
+
+
+def compute_user_stats(user_id, transaction=None):
+    """Rebuild the dashboard counters from the user's projects"""
+    # Only the fields needed for the counters, not the full results maps
+    projects_list = list(user_projects_ref(user_id).select(['status', 'total_stems']).stream(transaction=transaction))
+    stats = {
+        'total_projects': len(projects_list),
+        'processed_songs': 0,
+        'total_extracts': 0
+    }
+    
+    for project_doc in projects_list:
+        project_data = project_doc.to_dict()
+        if project_data.get('status') == 'completed':
+            stats['processed_songs'] += 1
+            stats['total_extracts'] += project_data.get('total_stems', 0)
+    
+    return stats
+
+
+def backfill_user_stats(user_id):
+    """Rebuild the dashboard counters unless they already carry the current STATS_VERSION"""
+    stats_ref = user_stats_ref(user_id)
+    
+    @firestore.transactional
+    def backfill_in_transaction(transaction):
+        stats_doc = stats_ref.get(transaction=transaction)
+        stats = stats_doc.to_dict() if stats_doc.exists else {}
+        if stats.get('version') == STATS_VERSION:
+            return stats
+        
+        # Inside the transaction, so increments from concurrent writers aren't lost
+        stats = compute_user_stats(user_id, transaction)
+        stats['version'] = STATS_VERSION
+        transaction.set(stats_ref, stats)
+        return stats
+    
+    return backfill_in_transaction(get_db().transaction())
+
+
+def update_project_status(user_id, project_id, fields):
+    """Update a project's status and the dashboard counters in one transaction, False if the project is gone"""
+    # Counters are adjusted from the status the project actually had, so overlapping runs
+    # of the same project can't count it twice
+    project_ref = user_projects_ref(user_id).document(project_id)
+    
+    @firestore.transactional
+    def update_in_transaction(transaction):
+        project_doc = project_ref.get(transaction=transaction)
+        if not project_doc.exists:
+            return False
+        
+        previous = project_doc.to_dict()
+        was_completed = previous.get('status') == 'completed'
+        now_completed = fields['status'] == 'completed'
+        processed_delta = int(now_completed) - int(was_completed)
+        extracts_delta = ((fields.get('total_stems', 0) if now_completed else 0)
+                          - (previous.get('total_stems', 0) if was_completed else 0))
+        
+        transaction.update(project_ref, fields)
+        if processed_delta or extracts_delta:
+            transaction.set(user_stats_ref(user_id), {
+                'processed_songs': firestore.Increment(processed_delta),
+                'total_extracts': firestore.Increment(extracts_delta)
+            }, merge=True)
+        return True
+    
+    return update_in_transaction(get_db().transaction())
 
 
 
@@ -75,6 +271,29 @@ def auth_required(f):
     return decorated_function
 
 
+# Recently verified ID tokens, keyed by SHA-256 of the token
+# Revocation is only checked on a cache miss, so keep the TTL short
+_token_cache = TTLCache(maxsize=10000, ttl=300)
+_token_cache_lock = threading.Lock()
+
+
+def verify_token_cached(token):
+    """Verify a Firebase ID token, reusing the claims of a recently verified one"""
+    token_hash = hashlib.sha256(token.encode()).digest()
+    with _token_cache_lock:
+        decoded_token = _token_cache.get(token_hash)
+    
+    # Never serve a cached token past its own expiry
+    if decoded_token is not None and decoded_token.get('exp', 0) > time.time():
+        return decoded_token
+    
+    init_firebase()
+    decoded_token = auth.verify_id_token(token, check_revoked=True, clock_skew_seconds=60)
+    with _token_cache_lock:
+        _token_cache[token_hash] = decoded_token
+    return decoded_token
+
+
 @app.route('/auth', methods=['POST'])
 def authorize():
     token = request.headers.get('Authorization')
@@ -84,7 +303,7 @@ def authorize():
     token = token[7:]  # Strip off 'Bearer ' to get the actual token
 
     try:
-        decoded_token = auth.verify_id_token(token, check_revoked=True, clock_skew_seconds=60) # Validate token here
+        decoded_token = verify_token_cached(token) # Validate token here
         session['user'] = decoded_token # Add user to session
         return redirect(url_for('dashboard'))
     
@@ -146,29 +365,19 @@ def dashboard():
     """Display dashboard with user stats"""
     user_id = session['user']['uid']
     try:
-        # Fetch projects from user-specific collection
-        projects_ref = db.collection('users').document(user_id).collection('projects').stream()
-        projects_list = list(projects_ref)
-        total_projects = len(projects_list)
-        
-        # Calculate processed songs and total extracts
-        processed_songs = 0
-        total_extracts = 0
-        
-        for project_doc in projects_list:
-            project_data = project_doc.to_dict()
-            if project_data.get('status') == 'completed':
-                processed_songs += 1
-            results = project_data.get('results', {})
-            if results:
-                total_extracts += len(results)
+        # Counters are maintained on create/complete/delete, so this is a single read
+        stats_doc = user_stats_ref(user_id).get()
+        stats = stats_doc.to_dict() if stats_doc.exists else {}
+        if stats.get('version') != STATS_VERSION:
+            # Not backfilled yet, any counters there are only increments since they were introduced
+            stats = backfill_user_stats(user_id)
         
         return render_template('dashboard.html', 
-                             total_projects=total_projects,
-                             processed_songs=processed_songs,
-                             total_extracts=total_extracts)
+                             total_projects=stats.get('total_projects', 0),
+                             processed_songs=stats.get('processed_songs', 0),
+                             total_extracts=stats.get('total_extracts', 0))
     except Exception as e:
-        print(f"Error fetching dashboard data: {e}")
+        logger.exception("Error fetching dashboard data: %s", e)
         return render_template('dashboard.html', 
                              total_projects=0,
                              processed_songs=0,
@@ -178,21 +387,38 @@ def dashboard():
 @app.route('/projects')
 @auth_required
 def projects():
-    """Display all projects for the logged-in user"""
+    """Display the logged-in user's projects, most recently updated first"""
     user_id = session['user']['uid']
     try:
-        # Fetch projects from user-specific collection
-        projects_ref = db.collection('users').document(user_id).collection('projects').stream()
+        # Only the fields the list shows, the results maps are loaded in project_detail
+        query = (user_projects_ref(user_id)
+                 .select(['name', 'description', 'status', 'created_at', 'updated_at', 'total_stems'])
+                 .order_by('updated_at', direction=firestore.Query.DESCENDING))
+        
+        # "Load more" passes the last project shown as the cursor
+        after = request.args.get('after')
+        if after:
+            # Only the ordering field, never the results map
+            cursor_doc = user_projects_ref(user_id).document(after).get(field_paths=['updated_at'])
+            if cursor_doc.exists:
+                query = query.start_after(cursor_doc)
+        
+        # Fetch one extra to know if there is another page
         projects_list = []
-        for doc in projects_ref:
+        for doc in query.limit(PROJECTS_PAGE_SIZE + 1).stream():
             project_data = doc.to_dict()
             project_data['id'] = doc.id
             projects_list.append(project_data)
         
-        return render_template('projects.html', projects=projects_list)
+        next_cursor = None
+        if len(projects_list) > PROJECTS_PAGE_SIZE:
+            projects_list = projects_list[:PROJECTS_PAGE_SIZE]
+            next_cursor = projects_list[-1]['id']
+        
+        return render_template('projects.html', projects=projects_list, next_cursor=next_cursor)
     except Exception as e:
-        print(f"Error fetching projects: {e}")
-        return render_template('projects.html', projects=[])
+        logger.exception("Error fetching projects: %s", e)
+        return render_template('projects.html', projects=[], next_cursor=None)
 
 
 @app.route('/project/create', methods=['GET', 'POST'])
@@ -208,11 +434,6 @@ def create_project():
             return render_template('create_project.html', error='Project name is required'), 400
         
         try:
-            # Check if project name already exists for this user
-            existing_projects = db.collection('users').document(user_id).collection('projects').where('name', '==', project_name).stream()
-            if any(existing_projects):
-                return render_template('create_project.html', error=f'A project with name "{project_name}" already exists'), 400
-            
             # Save project to user-specific collection
             project_data = {
                 'name': project_name,
@@ -224,12 +445,26 @@ def create_project():
                 'status': 'created'
             }
             # Store under users/{user_id}/projects/{project_id}
-            doc_ref = db.collection('users').document(user_id).collection('projects').document()
-            doc_ref.set(project_data)
+            doc_ref = user_projects_ref(user_id).document()
+            name_ref = project_name_ref(user_id, project_name)
+            
+            @firestore.transactional
+            def create_in_transaction(transaction):
+                # Check if project name already exists for this user
+                if project_name_taken(user_id, project_name, doc_ref.id, transaction):
+                    return False
+                
+                transaction.set(name_ref, {'project_id': doc_ref.id})
+                transaction.set(doc_ref, project_data)
+                transaction.set(user_stats_ref(user_id), {'total_projects': firestore.Increment(1)}, merge=True)
+                return True
+            
+            if not create_in_transaction(get_db().transaction()):
+                return render_template('create_project.html', error=f'A project with name "{project_name}" already exists'), 400
             
             return redirect(url_for('project_detail', project_id=doc_ref.id))
         except Exception as e:
-            print(f"Error creating project: {e}")
+            logger.exception("Error creating project: %s", e)
             return render_template('create_project.html', error='Failed to create project'), 500
     
     return render_template('create_project.html')
@@ -242,7 +477,7 @@ def project_detail(project_id):
     user_id = session['user']['uid']
     try:
         # Fetch project from user-specific collection
-        doc = db.collection('users').document(user_id).collection('projects').document(project_id).get()
+        doc = user_projects_ref(user_id).document(project_id).get()
         
         if not doc.exists:
             abort(404)
@@ -251,22 +486,17 @@ def project_detail(project_id):
         project['id'] = doc.id
         return render_template('project_detail.html', project=project)
     except Exception as e:
-        print(f"Error fetching project: {e}")
+        logger.exception("Error fetching project: %s", e)
         abort(404)
 
 
 @app.route('/project/<project_id>/upload', methods=['POST'])
 @auth_required
 def upload_song(project_id):
-    """Handle song upload, processing, and storing results"""
+    """Handle song upload and queue it for background processing"""
     user_id = session['user']['uid']
     
     try:
-        # Verify project ownership (user-specific collection)
-        project_doc = db.collection('users').document(user_id).collection('projects').document(project_id).get()
-        if not project_doc.exists:
-            return jsonify({'error': 'Unauthorized'}), 403
-        
         if 'file' not in request.files:
             return jsonify({'error': 'No file provided'}), 400
         
@@ -274,89 +504,133 @@ def upload_song(project_id):
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
         
-        # Validate file extension
-        file_ext = file.filename.rsplit('.', 1)[-1].lower()
+        # Validate file extension (on the sanitized name, never the raw client input)
+        filename = secure_filename(file.filename)
+        file_ext = filename.rpartition('.')[2].lower()
         if file_ext not in ALLOWED_EXTENSIONS:
-            return jsonify({'error': f'Invalid file type. Allowed: {", ".join(ALLOWED_EXTENSIONS)}'}), 400
+            return jsonify({'error': f'Invalid file type. Allowed: {ALLOWED_EXTENSIONS_STR}'}), 400
+        
+        # Verify project ownership (user-specific collection) while the upload is written to disk
+        project_future = io_executor.submit(user_projects_ref(user_id).document(project_id).get)
         
-        # Save file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_ext}') as tmp_file:
-            file.save(tmp_file.name)
-            temp_audio_path = tmp_file.name
+        # Stream the upload straight into a temp file (1MB chunks)
+        tmp_file = tempfile.NamedTemporaryFile(delete=False, dir=UPLOAD_TMP_DIR, suffix=f'.{file_ext}')
+        temp_audio_path = tmp_file.name
         
+        # Until the task owns the file, any way out of here has to remove it
+        handed_off = False
         try:
-            # Update project status to processing
-            db.collection('users').document(user_id).collection('projects').document(project_id).update({
-                'status': 'processing',
-                'processing_started_at': firestore.SERVER_TIMESTAMP
-            })
-            
-            print(f"Processing audio for project: {project_id} (user: {user_id})")
+            with tmp_file:
+                shutil.copyfileobj(file.stream, tmp_file, length=1024 * 1024)
             
-            # Process and upload to Cloudinary
-            results = music_processor.process_and_upload(
-                temp_audio_path,
-                project_id,
-                user_id
-            )
+            project_doc = project_future.result()
+            if not project_doc.exists:
+                return jsonify({'error': 'Unauthorized'}), 403
             
-            # Format results for storage
-            formatted_results = {}
-            for stem_name, stem_data in results['stems'].items():
-                # Include all stems, but mark failed ones
-                display_name = format_stem_name(stem_name)
-                formatted_results[stem_name] = {
-                    'name': display_name,
-                    'emoji': get_instrument_emoji(stem_name),
-                    'url': stem_data.get('url'),
-                    'public_id': stem_data.get('public_id'),
-                    'format': stem_data.get('format'),
-                    'size': stem_data.get('size'),
-                    'error': stem_data.get('error')
-                }
-                print(f"Stem {stem_name}: url={stem_data.get('url')}, error={stem_data.get('error')}")
-            
-            # Save results to user-specific project (only include successful stems in return)
-            successful_stems = {k: v for k, v in formatted_results.items() if v.get('url')}
-            
-            db.collection('users').document(user_id).collection('projects').document(project_id).update({
-                'results': formatted_results,  # Store all (with errors for debugging)
-                'status': 'completed',
-                'total_stems': len(successful_stems),
-                'processing_completed_at': firestore.SERVER_TIMESTAMP
-            })
-            
-            return jsonify({
-                'status': 'success',
-                'message': 'Song processed successfully!',
-                'results': successful_stems,  # Return only successful ones to frontend
-                'total_stems': len(successful_stems)
-            }), 200
-        
-        except Exception as e:
-            # Update project status to failed
-            db.collection('users').document(user_id).collection('projects').document(project_id).update({
-                'status': 'failed',
-                'error': str(e),
-                'processing_failed_at': firestore.SERVER_TIMESTAMP
-            })
+            # Update project status to processing, re-processing a completed song takes it
+            # out of the dashboard counters until it completes again
+            if not update_project_status(user_id, project_id, {'status': 'processing'}):
+                return jsonify({'error': 'Project not found'}), 404
+            invalidate_results_cache(user_id, project_id)
             
-            print(f"Error processing audio: {str(e)}")
-            return jsonify({
-                'status': 'error',
-                'error': f'Processing failed: {str(e)}'
-            }), 500
+            # Hand off to the background worker, the frontend polls /results for completion
+            try:
+                if celery.conf.task_always_eager:
+                    with _inprocess_processing:
+                        process_song_task.delay(temp_audio_path, project_id, user_id)
+                else:
+                    process_song_task.delay(temp_audio_path, project_id, user_id)
+            except Exception as e:
+                # Broker unreachable: nothing will pick the file up, so don't leave the project processing
+                logger.exception("Error queueing song processing: %s", e)
+                update_project_status(user_id, project_id, {
+                    'status': 'failed',
+                    'error': 'Could not queue the song for processing, please try again',
+                    'processing_failed_at': firestore.SERVER_TIMESTAMP
+                })
+                invalidate_results_cache(user_id, project_id)
+                return jsonify({'error': 'Processing is unavailable right now, please try again'}), 503
+            handed_off = True
         
         finally:
-            # Clean up temporary file
-            if os.path.exists(temp_audio_path):
-                os.remove(temp_audio_path)
+            if not handed_off:
+                os.unlink(temp_audio_path)
+        
+        return jsonify({'status': 'queued'}), 202
     
     except Exception as e:
-        print(f"Error in upload_song: {e}")
+        logger.exception("Error in upload_song: %s", e)
         return jsonify({'error': 'Upload failed'}), 500
 
 
+@celery.task
+def process_song_task(temp_audio_path, project_id, user_id):
+    """Process an uploaded song in the background and store the results"""
+    try:
+        logger.info("Processing audio for project: %s (user: %s)", project_id, user_id)
+        
+        # Process and upload to Cloudinary
+        results = music_processor.process_and_upload(
+            temp_audio_path,
+            project_id,
+            user_id
+        )
+        
+        # Format results for storage, only successful stems count towards the total
+        formatted_results, successful_stems = {}, {}
+        for stem_name, stem_data in results['stems'].items():
+            # Include all stems, but mark failed ones
+            display_name = format_stem_name(stem_name)
+            entry = {
+                'name': display_name,
+                'emoji': get_instrument_emoji(stem_name),
+                'url': stem_data.get('url'),
+                'public_id': stem_data.get('public_id'),
+                'format': stem_data.get('format'),
+                'size': stem_data.get('size'),
+                'error': stem_data.get('error')
+            }
+            formatted_results[stem_name] = entry
+            if entry['url']:
+                successful_stems[stem_name] = entry
+        
+        # Results and dashboard counters go out in a single transaction
+        update_project_status(user_id, project_id, {
+            'results': formatted_results,  # Store all (with errors for debugging)
+            'status': 'completed',
+            'total_stems': len(successful_stems),
+            'processing_completed_at': firestore.SERVER_TIMESTAMP
+        })
+    
+    except Exception as e:
+        # Update project status to failed (an earlier overlapping run may have completed it)
+        update_project_status(user_id, project_id, {
+            'status': 'failed',
+            'error': str(e),
+            'processing_failed_at': firestore.SERVER_TIMESTAMP
+        })
+        
+        logger.exception("Error processing audio: %s", e)
+    
+    finally:
+        # Clean up temporary file
+        try:
+            os.unlink(temp_audio_path)
+        except FileNotFoundError:
+            pass
+
+
+# Recent get_results payloads of processing projects, keyed by (user_id, project_id)
+_results_cache = TTLCache(maxsize=10000, ttl=3)
+_results_cache_lock = threading.Lock()
+
+
+def invalidate_results_cache(user_id, project_id):
+    """Drop a cached get_results payload after the project changes in this process"""
+    with _results_cache_lock:
+        _results_cache.pop((user_id, project_id), None)
+
+
 @app.route('/project/<project_id>/results')
 @auth_required
 def get_results(project_id):
@@ -364,26 +638,42 @@ def get_results(project_id):
     user_id = session['user']['uid']
     
     try:
-        doc = db.collection('users').document(user_id).collection('projects').document(project_id).get()
+        # The frontend polls this while processing, so serve repeat polls from a short-lived cache
+        cache_key = (user_id, project_id)
+        with _results_cache_lock:
+            payload = _results_cache.get(cache_key)
         
-        if not doc.exists:
-            return jsonify({'error': 'Project not found'}), 404
-        
-        project = doc.to_dict()
-        all_results = project.get('results', {})
-        
-        # Filter to only show successful stems (those with URLs)
-        successful_results = {k: v for k, v in all_results.items() if v.get('url')}
+        if payload is None:
+            doc = user_projects_ref(user_id).document(project_id).get()
+            
+            if not doc.exists:
+                return jsonify({'error': 'Project not found'}), 404
+            
+            project = doc.to_dict()
+            all_results = project.get('results', {})
+            
+            # Filter to only show successful stems (those with URLs)
+            successful_results = {k: v for k, v in all_results.items() if v.get('url')}
+            
+            payload = {
+                'status': project.get('status', 'unknown'),
+                'results': successful_results,
+                'total_stems': len(successful_results),
+                'error': project.get('error')
+            }
+            # Only the poll-heavy processing state is cached. Other processes (web workers, the Celery
+            # worker) can't invalidate this cache, and a stale created/completed would end polling early
+            if payload['status'] == 'processing':
+                with _results_cache_lock:
+                    _results_cache[cache_key] = payload
         
-        return jsonify({
-            'status': project.get('status', 'unknown'),
-            'results': successful_results,
-            'total_stems': len(successful_results),
-            'error': project.get('error')
-        }), 200
+        # ETag lets unchanged results come back as 304 Not Modified
+        response = jsonify(payload)
+        response.add_etag()
+        return response.make_conditional(request)
     
     except Exception as e:
-        print(f"Error fetching results: {e}")
+        logger.exception("Error fetching results: %s", e)
         return jsonify({'error': 'Failed to fetch results'}), 500
 
 
@@ -400,28 +690,44 @@ def rename_project(project_id):
             return jsonify({'error': 'Project name cannot be empty'}), 400
         
         # Get project reference
-        project_ref = db.collection('users').document(user_id).collection('projects').document(project_id)
-        project_doc = project_ref.get()
+        project_ref = user_projects_ref(user_id).document(project_id)
+        new_name_ref = project_name_ref(user_id, new_name)
         
-        if not project_doc.exists:
-            return jsonify({'error': 'Project not found'}), 404
-        
-        # Check if new name already exists for this user
-        existing_projects = db.collection('users').document(user_id).collection('projects').where('name', '==', new_name).stream()
-        for doc in existing_projects:
-            if doc.id != project_id:  # Allow same name if it's the same project
-                return jsonify({'error': f'A project with name "{new_name}" already exists'}), 400
+        @firestore.transactional
+        def rename_in_transaction(transaction):
+            project_doc = project_ref.get(transaction=transaction)
+            if not project_doc.exists:
+                return 'not_found'
+            
+            # Check if new name already exists for this user (same name is fine if it's the same project)
+            if project_name_taken(user_id, new_name, project_id, transaction):
+                return 'duplicate'
+            
+            # The old name's reservation, released only if it belongs to this project
+            old_name = project_doc.to_dict().get('name', '')
+            old_name_ref = project_name_ref(user_id, old_name)
+            old_name_doc = old_name_ref.get(transaction=transaction)
+            
+            # Move the name reservation and update the project name
+            if old_name != new_name and old_name_doc.exists and old_name_doc.get('project_id') == project_id:
+                transaction.delete(old_name_ref)
+            transaction.set(new_name_ref, {'project_id': project_id})
+            transaction.update(project_ref, {
+                'name': new_name,
+                'updated_at': firestore.SERVER_TIMESTAMP
+            })
+            return 'renamed'
         
-        # Update the project name
-        project_ref.update({
-            'name': new_name,
-            'updated_at': firestore.SERVER_TIMESTAMP
-        })
+        outcome = rename_in_transaction(get_db().transaction())
+        if outcome == 'not_found':
+            return jsonify({'error': 'Project not found'}), 404
+        if outcome == 'duplicate':
+            return jsonify({'error': f'A project with name "{new_name}" already exists'}), 400
         
         return jsonify({'status': 'success', 'message': 'Project renamed successfully'}), 200
     
     except Exception as e:
-        print(f"Error renaming project: {e}")
+        logger.exception("Error renaming project: %s", e)
         return jsonify({'error': 'Failed to rename project'}), 500
 
 
@@ -433,19 +739,39 @@ def delete_project(project_id):
         user_id = session['user']['uid']
         
         # Get project reference
-        project_ref = db.collection('users').document(user_id).collection('projects').document(project_id)
-        project_doc = project_ref.get()
+        project_ref = user_projects_ref(user_id).document(project_id)
         
-        if not project_doc.exists:
-            return jsonify({'error': 'Project not found'}), 404
+        @firestore.transactional
+        def delete_in_transaction(transaction):
+            project_doc = project_ref.get(transaction=transaction)
+            if not project_doc.exists:
+                return False
+            
+            # Release the name, unless the reservation belongs to another project
+            project = project_doc.to_dict()
+            name_ref = project_name_ref(user_id, project.get('name', ''))
+            name_doc = name_ref.get(transaction=transaction)
+            
+            # Delete the project and take it out of the dashboard counters
+            stats_update = {'total_projects': firestore.Increment(-1)}
+            if project.get('status') == 'completed':
+                stats_update['processed_songs'] = firestore.Increment(-1)
+                stats_update['total_extracts'] = firestore.Increment(-project.get('total_stems', 0))
+            
+            transaction.delete(project_ref)
+            if name_doc.exists and name_doc.get('project_id') == project_id:
+                transaction.delete(name_ref)
+            transaction.set(user_stats_ref(user_id), stats_update, merge=True)
+            return True
         
-        # Delete the project
-        project_ref.delete()
+        if not delete_in_transaction(get_db().transaction()):
+            return jsonify({'error': 'Project not found'}), 404
+        invalidate_results_cache(user_id, project_id)
         
         return jsonify({'status': 'success', 'message': 'Project deleted successfully'}), 200
     
     except Exception as e:
-        print(f"Error deleting project: {e}")
+        logger.exception("Error deleting project: %s", e)
         return jsonify({'error': 'Failed to delete project'}), 500
 
 
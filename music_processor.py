@@ -4,16 +4,152 @@ For Python 3.14 compatibility, we're using a simplified approach
 """
 
 import os
-import tempfile
-import shutil
+import io
+import warnings
+import functools
 import numpy as np
+import scipy.signal
+import scipy.fft
 import librosa
+from numba import njit
 import soundfile as sf
 from pathlib import Path
 import cloudinary
 import cloudinary.uploader
 import json
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+# Fixed analysis settings: every clip is resampled to SAMPLE_RATE and uses the same STFT
+SAMPLE_RATE = 22050
+N_FFT = 2048
+HOP_LENGTH = N_FFT // 4
+
+# Built once instead of on every stft/istft call. float32 so it doesn't upcast the
+# chain, like librosa's default float64 window would.
+HANN_WINDOW = scipy.signal.windows.hann(N_FFT, sym=False).astype(np.float32)
+
+# Every stem is the same kernel: a frequency mask over one HPSS part of the shared STFT.
+# Rows are (name, HPSS source, base gain, bands set to a gain, bands scaled by a gain),
+# bands are (low Hz, high Hz, gain), exclusive on both ends.
+STEM_CONFIG = [
+    # Vocals typically 80Hz - 4000Hz with emphasis on 150Hz-3000Hz
+    ('vocals', 'harmonic', 0.0, [(80, 4000, 1.2)], [(150, 3000, 1.3)]),
+    # Drums: reduce very low and very high frequencies to focus on 50Hz-5kHz
+    ('drums', 'percussive', 1.0, [(-np.inf, 50, 0.3), (5000, np.inf, 0.3)], []),
+    # Bass: low frequencies (20Hz - 250Hz), boosted sub-bass
+    ('bass', 'harmonic', 0.0, [(20, 250, 1.8)], [(20, 100, 1.2)]),
+    # Guitar: mid-range (80Hz - 2kHz), emphasizing fundamentals
+    ('guitar', 'harmonic', 0.0, [(80, 2000, 1.4)], [(200, 1000, 1.2)]),
+    # Piano: wide range 27Hz - 4186Hz, emphasizing its harmonic series
+    ('piano', 'harmonic', 0.0, [(27, 4200, 0.8)], [(200, 2000, 1.3)]),
+    # Flute & woodwinds: 261Hz - 4186Hz with bright character
+    ('flute', 'harmonic', 0.0, [(250, 4200, 0.9)], [(1000, 3500, 1.4)]),
+    # Strings: 40Hz - 3500Hz with body emphasis
+    ('strings', 'harmonic', 0.0, [(40, 3500, 0.9)], [(150, 1500, 1.3)]),
+    # Background/ambience: high frequencies and reverb
+    ('background', 'harmonic', 0.0, [(3000, np.inf, 1.2)], [(5000, np.inf, 1.1)]),
+    # Other instruments (brass, percussion effects): remaining percussive content, reduced sub-bass
+    ('instrumental', 'percussive', 1.0, [], [(-np.inf, 100, 0.5)]),
+]
+STEM_NAMES = [name for name, *_ in STEM_CONFIG]
+
+
+@functools.lru_cache(maxsize=8)
+def _build_mask_matrix(sr, n_fft):
+    """
+    Build all stem masks for an STFT configuration (cached, they only depend on sr and n_fft)
+    
+    Args:
+        sr: Sample rate
+        n_fft: FFT size
+    
+    Returns:
+        np.ndarray: Read-only (n_stems, n_freq) float32 masks, rows in STEM_CONFIG order
+    """
+    freqs = librosa.fft_frequencies(sr=sr, n_fft=n_fft).astype(np.float32)
+    masks = np.empty((len(STEM_CONFIG), len(freqs)), dtype=np.float32)
+    for mask, (_, _, base, set_bands, scale_bands) in zip(masks, STEM_CONFIG):
+        mask[:] = base
+        for low, high, gain in set_bands:
+            mask[(freqs > low) & (freqs < high)] = gain
+        for low, high, gain in scale_bands:
+            mask[(freqs > low) & (freqs < high)] *= gain
+    
+    # Shared between calls, so make sure nobody modifies it in place
+    masks.setflags(write=False)
+    return masks
+
+
+@njit(cache=True, fastmath=True, nogil=True)
+def _peak_normalize(audio, target_level):
+    """Scale audio in place so its peak is target_level, finding the peak in the same kernel (releases the GIL)"""
+    peak = 0.0
+    for i in range(audio.shape[0]):
+        v = abs(audio[i])
+        if v > peak:
+            peak = v
+    if peak > 0:
+        scale = target_level / peak
+        for i in range(audio.shape[0]):
+            audio[i] *= scale
+    return audio
+
+
+# Not parallel=True: the kernel can be launched from several request threads at once (in-process
+# processing), which aborts the process under Numba's non-threadsafe workqueue layer
+@njit(cache=True, fastmath=True, nogil=True)
+def _overlap_add(frames, window, hop_length, first_frame, signal):
+    """Window (n_stems, n_fft, n_frames) frames and overlap-add them into signal"""
+    n_stems, n_fft, n_frames = frames.shape
+    for s in range(n_stems):
+        for n in range(n_fft):
+            w = window[n]
+            for t in range(n_frames):
+                signal[s, (first_frame + t) * hop_length + n] += w * frames[s, n, t]
+
+
+class _ThreadedFFT:
+    """scipy.fft (pocketfft) as librosa's FFT backend, with multi-threaded real transforms"""
+    
+    def __getattr__(self, name):
+        return getattr(scipy.fft, name)
+    
+    @staticmethod
+    def rfft(*args, **kwargs):
+        kwargs.setdefault('workers', -1)
+        return scipy.fft.rfft(*args, **kwargs)
+    
+    @staticmethod
+    def irfft(*args, **kwargs):
+        kwargs.setdefault('workers', -1)
+        return scipy.fft.irfft(*args, **kwargs)
+
+
+# pocketfft computes float32 natively and splits frame batches across cores.
+# set_fftlib is deprecated since librosa 0.11 (FutureWarning on import) and goes away in 1.0,
+# hence the <1.0 pin in requirements.txt. Our own iSTFT calls scipy.fft directly regardless.
+# Its FutureWarning is silenced so importing the app doesn't warn in every process.
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', FutureWarning)
+    librosa.set_fftlib(_ThreadedFFT())
+
+
+@functools.cache
+def _load_torch():
+    """
+    Optional: stems are reconstructed on the GPU when PyTorch with CUDA is installed.
+    Imported on first use, so processes that never separate audio (the web app) don't load it.
+    
+    Returns:
+        module: torch, or None if it isn't installed
+    """
+    try:
+        import torch
+    except ImportError:
+        return None
+    return torch
 
 
 class MusicProcessor:
@@ -32,6 +168,29 @@ class MusicProcessor:
             )
             self.cloudinary_configured = True
     
+    def _load_audio(self, audio_path, target_sr):
+        """
+        Load audio as mono float32, resampling only when the file's rate differs
+        
+        Args:
+            audio_path: Path to audio file
+            target_sr: Sample rate to return
+        
+        Returns:
+            tuple: (audio signal, sample rate)
+        """
+        try:
+            y, sr_native = sf.read(audio_path, dtype='float32', always_2d=False)
+            if y.ndim == 2:
+                y = y.mean(axis=1, dtype=np.float32)
+        except RuntimeError:
+            # Formats libsndfile can't decode (e.g. m4a) go through librosa's audioread fallback
+            y, sr_native = librosa.load(audio_path, sr=None, mono=True)
+        
+        if sr_native != target_sr:
+            y = librosa.resample(y, orig_sr=sr_native, target_sr=target_sr, res_type='soxr_hq')
+        return y, target_sr
+    
     def separate_audio_simple(self, audio_path):
         """
         Extract different instruments from audio using advanced frequency and temporal separation
@@ -42,208 +201,146 @@ class MusicProcessor:
             audio_path: Path to input audio file
         
         Returns:
-            tuple: (dict with stem paths, temp_dir path)
+            dict: Stem name -> in-memory WAV file (BytesIO)
         """
         try:
             print(f"🎵 Loading audio: {audio_path}")
             
             # Load audio file
-            y, sr = librosa.load(audio_path, sr=22050)  # Standardize to 22050Hz
-            duration = librosa.get_duration(y=y, sr=sr)
+            y, sr = self._load_audio(audio_path, target_sr=SAMPLE_RATE)  # Standardize to 22050Hz
+            duration = len(y) / sr
             print(f"✓ Audio loaded: {duration:.2f}s at {sr}Hz, shape: {y.shape}")
             
             # Ensure audio is not too short
             if duration < 0.5:
                 raise Exception(f"Audio too short ({duration:.2f}s). Minimum 0.5 seconds required")
             
-            # Create temporary directory
-            temp_dir = tempfile.mkdtemp()
-            output_files = {}
-            
             print("🔄 Separating audio using HPSS...")
-            # HPSS: Harmonic/Percussive Source Separation
-            y_harmonic, y_percussive = librosa.effects.hpss(y, margin=2.0)
-            print(f"✓ HPSS complete - Harmonic: {y_harmonic.shape}, Percussive: {y_percussive.shape}")
-            
-            # Get frequency bins for analysis
-            S_harmonic = librosa.magphase(librosa.stft(y_harmonic))[0]
-            S_percussive = librosa.magphase(librosa.stft(y_percussive))[0]
-            freqs = librosa.fft_frequencies(sr=sr)
-            S_harmonic_phase = np.angle(librosa.stft(y_harmonic))
-            S_percussive_phase = np.angle(librosa.stft(y_percussive))
-            
-            # ============ VOCALS ============
-            print("🎤 Extracting vocals...")
-            vocal_mask = np.zeros_like(freqs)
-            # Vocals typically 80Hz - 4000Hz with emphasis on 150Hz-3000Hz
-            vocal_idx = (freqs > 80) & (freqs < 4000)
-            vocal_mask[vocal_idx] = 1.2
-            mid_idx = (freqs > 150) & (freqs < 3000)
-            vocal_mask[mid_idx] *= 1.3
-            
-            S_vocal = S_harmonic * vocal_mask[:, np.newaxis]
-            D_vocal = S_vocal * np.exp(1j * S_harmonic_phase)
-            y_vocals = librosa.istft(D_vocal)
-            y_vocals = self._normalize_audio(y_vocals)
-            vocals_path = os.path.join(temp_dir, 'vocals.wav')
-            sf.write(vocals_path, y_vocals, sr)
-            output_files['vocals'] = vocals_path
-            print(f"✓ Vocals saved: {vocals_path}")
-            
-            # ============ DRUMS ============
-            print("🥁 Extracting drums...")
-            # Drums are primarily percussive with emphasis on lower frequencies
-            drums_mask = np.ones_like(freqs)
-            # Reduce very low and very high frequencies to focus on drum range (50Hz-5kHz)
-            low_reduce = freqs < 50
-            high_reduce = freqs > 5000
-            drums_mask[low_reduce] = 0.3
-            drums_mask[high_reduce] = 0.3
-            
-            S_drums = S_percussive * drums_mask[:, np.newaxis]
-            D_drums = S_drums * np.exp(1j * S_percussive_phase)
-            y_drums = librosa.istft(D_drums)
-            y_drums = self._normalize_audio(y_drums)
-            drums_path = os.path.join(temp_dir, 'drums.wav')
-            sf.write(drums_path, y_drums, sr)
-            output_files['drums'] = drums_path
-            print(f"✓ Drums saved: {drums_path}")
-            
-            # ============ BASS ============
-            print("🔊 Extracting bass...")
-            # Bass: low frequencies from harmonic (20Hz - 200Hz)
-            bass_mask = np.zeros_like(freqs)
-            bass_idx = (freqs > 20) & (freqs < 250)
-            bass_mask[bass_idx] = 1.8
-            sub_bass_idx = (freqs > 20) & (freqs < 100)
-            bass_mask[sub_bass_idx] *= 1.2
-            
-            S_bass = S_harmonic * bass_mask[:, np.newaxis]
-            D_bass = S_bass * np.exp(1j * S_harmonic_phase)
-            y_bass = librosa.istft(D_bass)
-            y_bass = self._normalize_audio(y_bass)
-            bass_path = os.path.join(temp_dir, 'bass.wav')
-            sf.write(bass_path, y_bass, sr)
-            output_files['bass'] = bass_path
-            print(f"✓ Bass saved: {bass_path}")
-            
-            # ============ GUITAR ============
-            print("🎸 Extracting guitar...")
-            # Guitar: mid-range frequencies (80Hz - 2kHz)
-            guitar_mask = np.zeros_like(freqs)
-            guitar_idx = (freqs > 80) & (freqs < 2000)
-            guitar_mask[guitar_idx] = 1.4
-            # Emphasize fundamental frequencies of guitar
-            guitar_strong_idx = (freqs > 200) & (freqs < 1000)
-            guitar_mask[guitar_strong_idx] *= 1.2
-            
-            S_guitar = S_harmonic * guitar_mask[:, np.newaxis]
-            D_guitar = S_guitar * np.exp(1j * S_harmonic_phase)
-            y_guitar = librosa.istft(D_guitar)
-            y_guitar = self._normalize_audio(y_guitar)
-            guitar_path = os.path.join(temp_dir, 'guitar.wav')
-            sf.write(guitar_path, y_guitar, sr)
-            output_files['guitar'] = guitar_path
-            print(f"✓ Guitar saved: {guitar_path}")
-            
-            # ============ PIANO ============
-            print("🎹 Extracting piano...")
-            # Piano: wide frequency range with emphasis 27Hz - 4186Hz, but distributed
-            piano_mask = np.zeros_like(freqs)
-            piano_idx = (freqs > 27) & (freqs < 4200)
-            piano_mask[piano_idx] = 0.8
-            # Piano has distinct harmonic series
-            piano_mid = (freqs > 200) & (freqs < 2000)
-            piano_mask[piano_mid] *= 1.3
-            
-            S_piano = S_harmonic * piano_mask[:, np.newaxis]
-            D_piano = S_piano * np.exp(1j * S_harmonic_phase)
-            y_piano = librosa.istft(D_piano)
-            y_piano = self._normalize_audio(y_piano)
-            piano_path = os.path.join(temp_dir, 'piano.wav')
-            sf.write(piano_path, y_piano, sr)
-            output_files['piano'] = piano_path
-            print(f"✓ Piano saved: {piano_path}")
-            
-            # ============ FLUTE & WOODWINDS ============
-            print("🪶 Extracting flute & woodwinds...")
-            # Flute: high frequencies 261Hz - 4186Hz with bright character
-            flute_mask = np.zeros_like(freqs)
-            flute_idx = (freqs > 250) & (freqs < 4200)
-            flute_mask[flute_idx] = 0.9
-            flute_bright = (freqs > 1000) & (freqs < 3500)
-            flute_mask[flute_bright] *= 1.4
-            
-            S_flute = S_harmonic * flute_mask[:, np.newaxis]
-            D_flute = S_flute * np.exp(1j * S_harmonic_phase)
-            y_flute = librosa.istft(D_flute)
-            y_flute = self._normalize_audio(y_flute)
-            flute_path = os.path.join(temp_dir, 'flute.wav')
-            sf.write(flute_path, y_flute, sr)
-            output_files['flute'] = flute_path
-            print(f"✓ Flute saved: {flute_path}")
-            
-            # ============ STRINGS ============
-            print("🎻 Extracting strings...")
-            # Strings: mid-high frequencies 40Hz - 3500Hz with natural decay
-            strings_mask = np.zeros_like(freqs)
-            strings_idx = (freqs > 40) & (freqs < 3500)
-            strings_mask[strings_idx] = 0.9
-            strings_body = (freqs > 150) & (freqs < 1500)
-            strings_mask[strings_body] *= 1.3
-            
-            S_strings = S_harmonic * strings_mask[:, np.newaxis]
-            D_strings = S_strings * np.exp(1j * S_harmonic_phase)
-            y_strings = librosa.istft(D_strings)
-            y_strings = self._normalize_audio(y_strings)
-            strings_path = os.path.join(temp_dir, 'strings.wav')
-            sf.write(strings_path, y_strings, sr)
-            output_files['strings'] = strings_path
-            print(f"✓ Strings saved: {strings_path}")
-            
-            # ============ HIGH FREQUENCY ELEMENTS (background, ambience) ============
-            print("✨ Extracting background & ambience...")
-            # Background/Ambience: high frequencies and reverb
-            bg_mask = np.zeros_like(freqs)
-            bg_idx = (freqs > 3000)
-            bg_mask[bg_idx] = 1.2
-            very_high = freqs > 5000
-            bg_mask[very_high] *= 1.1
-            
-            S_background = S_harmonic * bg_mask[:, np.newaxis]
-            D_background = S_background * np.exp(1j * S_harmonic_phase)
-            y_background = librosa.istft(D_background)
-            y_background = self._normalize_audio(y_background)
-            background_path = os.path.join(temp_dir, 'background.wav')
-            sf.write(background_path, y_background, sr)
-            output_files['background'] = background_path
-            print(f"✓ Background saved: {background_path}")
-            
-            # ============ INSTRUMENTAL (remaining percussive that's not drums) ============
-            print("🎺 Extracting other instruments...")
-            # Brass, percussion effects, etc. - remaining percussive content
-            instr_mask = np.ones_like(freqs)
-            instr_mask[freqs < 100] *= 0.5  # Reduce sub-bass
-            
-            S_instrumental = S_percussive * instr_mask[:, np.newaxis]
-            D_instrumental = S_instrumental * np.exp(1j * S_percussive_phase)
-            y_instrumental = librosa.istft(D_instrumental)
-            y_instrumental = self._normalize_audio(y_instrumental)
-            instrumental_path = os.path.join(temp_dir, 'instrumental.wav')
-            sf.write(instrumental_path, y_instrumental, sr)
-            output_files['instrumental'] = instrumental_path
-            print(f"✓ Instrumental saved: {instrumental_path}")
+            # HPSS: Harmonic/Percussive Source Separation, done on the spectrogram so the
+            # single STFT is shared and no intermediate iSTFT/STFT round trip is needed.
+            # Masking D directly equals masking the magnitude and reapplying the phase.
+            # librosa >= 0.10 frames the padded signal as a strided view and windows it block by block
+            D = librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH, window=HANN_WINDOW, center=True,
+                             pad_mode='constant', dtype=np.complex64)
+            D_harmonic, D_percussive = librosa.decompose.hpss(D, margin=2.0)
+            print(f"✓ HPSS complete - Harmonic: {D_harmonic.shape}, Percussive: {D_percussive.shape}")
+            
+            # All stem masks as one (n_stems, n_freq) float32 matrix
+            masks = _build_mask_matrix(sr, N_FFT)
+            
+            # Reconstruct every stem in one batched inverse STFT
+            parts = {'harmonic': D_harmonic, 'percussive': D_percussive}
+            sources = [parts[source] for _, source, *_ in STEM_CONFIG]
+            stem_signals = None
+            torch = _load_torch()
+            if torch is not None and torch.cuda.is_available():
+                try:
+                    stem_signals = self._batched_istft_gpu(sources, masks, HANN_WINDOW, HOP_LENGTH)
+                except torch.cuda.OutOfMemoryError:
+                    # The GPU path inverts the whole song at once, the CPU path works in frame blocks
+                    print("⚠️ GPU out of memory, reconstructing stems on the CPU")
+                if stem_signals is None:
+                    torch.cuda.empty_cache()  # Release what the failed attempt allocated
+            if stem_signals is None:
+                stem_signals = self._batched_istft(sources, masks, HANN_WINDOW, HOP_LENGTH)
+            
+            # Normalizing and encoding are independent per stem and both release the GIL.
+            # Stems are encoded straight into memory, nothing touches the disk.
+            def write_stem(name, y_stem):
+                y_stem = self._normalize_audio(y_stem)
+                # Convert to 16-bit ourselves so libsndfile writes the samples as-is
+                y_int16 = np.clip(y_stem * 32767, -32768, 32767).astype(np.int16)
+                stem_file = io.BytesIO()
+                sf.write(stem_file, y_int16, sr, format='WAV', subtype='PCM_16')
+                stem_file.seek(0)
+                print(f"✓ {name.capitalize()} encoded: {stem_file.getbuffer().nbytes / (1024 * 1024):.2f}MB")
+                return name, stem_file
+            
+            with ThreadPoolExecutor(max_workers=min(len(masks), os.cpu_count() or 1)) as executor:
+                output_files = dict(executor.map(write_stem, STEM_NAMES, stem_signals))
             
             print(f"\n✅ Processing complete!")
             print(f"   Stems created: {list(output_files.keys())}")
             print(f"   Total files: {len(output_files)}")
             
-            return output_files, temp_dir
+            return output_files
         
         except Exception as e:
             print(f"❌ Error during audio processing: {str(e)}")
             raise Exception(f"Audio processing failed: {str(e)}")
     
+    def _batched_istft(self, sources, masks, window, hop_length, block_frames=256):
+        """
+        Inverse STFT of several masked spectrograms at once, matching librosa.istft (center=True)
+        
+        Args:
+            sources: Complex spectrogram for each stem, shape (1 + n_fft//2, n_frames)
+            masks: (n_stems, 1 + n_fft//2) frequency masks applied to the sources
+            window: Synthesis window of length n_fft
+            hop_length: Hop between frames
+            block_frames: Frames transformed per batch, bounds the temporary arrays
+        
+        Returns:
+            np.ndarray: (n_stems, hop_length * (n_frames - 1)) float32 signals
+        """
+        n_fft = len(window)
+        n_stems = len(masks)
+        n_frames = sources[0].shape[-1]
+        
+        signal = np.zeros((n_stems, n_fft + hop_length * (n_frames - 1)), dtype=np.float32)
+        masked = np.empty((n_stems, masks.shape[1], min(block_frames, n_frames)), dtype=np.complex64)
+        
+        for start in range(0, n_frames, block_frames):
+            stop = min(start + block_frames, n_frames)
+            width = stop - start
+            # Mask straight into the batch buffer, no per-stem spectrogram temporaries
+            for i, (D, mask) in enumerate(zip(sources, masks)):
+                np.multiply(D[:, start:stop], mask[:, np.newaxis], out=masked[i, :, :width])
+            
+            # One multi-threaded inverse FFT over all stems' frames in this block
+            frames = scipy.fft.irfft(masked[:, :, :width], n=n_fft, axis=1, workers=-1)
+            
+            # Windowing fused into a JIT-compiled overlap-add
+            _overlap_add(frames, window, hop_length, start, signal)
+        
+        # Undo the summed window gain, as librosa.istft does
+        norm = librosa.filters.window_sumsquare(
+            window=window, n_frames=n_frames, hop_length=hop_length, n_fft=n_fft, dtype=np.float32
+        )
+        nonzero = norm > np.finfo(np.float32).tiny
+        signal[:, nonzero] /= norm[nonzero]
+        
+        # Trim the centering padding added by the forward STFT
+        return signal[:, n_fft // 2:-(n_fft // 2)]
+    
+    def _batched_istft_gpu(self, sources, masks, window, hop_length, device='cuda'):
+        """
+        GPU version of _batched_istft using torch.istft, same arguments and output
+        
+        Stems sharing a source spectrogram are masked and inverted in a single batch,
+        so each source is copied to the device once and only the waveforms come back.
+        """
+        torch = _load_torch()
+        n_fft = len(window)
+        n_frames = sources[0].shape[-1]
+        window_t = torch.from_numpy(window).to(device)
+        signals = np.empty((len(masks), hop_length * (n_frames - 1)), dtype=np.float32)
+        
+        # Group stem rows by the source they are masked from
+        groups = {}
+        for i, D in enumerate(sources):
+            groups.setdefault(id(D), (D, []))[1].append(i)
+        
+        with torch.inference_mode():
+            for D, rows in groups.values():
+                D_t = torch.from_numpy(D).to(device)
+                masks_t = torch.from_numpy(masks[rows]).to(device)
+                y_t = torch.istft(D_t.unsqueeze(0) * masks_t.unsqueeze(-1), n_fft=n_fft,
+                                  hop_length=hop_length, window=window_t, center=True)
+                signals[rows] = y_t.cpu().numpy()
+        
+        return signals
+    
     def _normalize_audio(self, audio, target_level=0.95):
         """
         Normalize audio to prevent clipping while maintaining dynamics
@@ -255,17 +352,15 @@ class MusicProcessor:
         Returns:
             Normalized audio
         """
-        max_val = np.max(np.abs(audio))
-        if max_val > 0:
-            return audio * (target_level / max_val)
-        return audio
+        # Scales in place, without the |audio| temporary and extra passes of numpy
+        return _peak_normalize(np.ascontiguousarray(audio), target_level)
     
-    def upload_to_cloudinary(self, file_path, public_id, folder='music_separation'):
+    def upload_to_cloudinary(self, audio_file, public_id, folder='music_separation'):
         """
         Upload audio file to Cloudinary with proper error handling
         
         Args:
-            file_path: Path to audio file
+            audio_file: Path to audio file, or a binary file-like object (e.g. BytesIO)
             public_id: Public ID for the file in Cloudinary
             folder: Folder name in Cloudinary
         
@@ -291,21 +386,30 @@ class MusicProcessor:
         try:
             print(f"Uploading to Cloudinary: {public_id}")
             
-            # Verify file exists before uploading
-            if not os.path.exists(file_path):
-                raise Exception(f"File does not exist: {file_path}")
+            if isinstance(audio_file, (str, os.PathLike)):
+                # Verify file exists before uploading
+                if not os.path.exists(audio_file):
+                    raise Exception(f"File does not exist: {audio_file}")
+                
+                file_size = os.path.getsize(audio_file)
+                # Upload in chunks from a buffered handle (1MB reads instead of many small ones)
+                audio_file = open(audio_file, 'rb', buffering=1 << 20)
+            else:
+                file_size = audio_file.seek(0, os.SEEK_END)
+                audio_file.seek(0)
             
             # Get file size for logging
-            file_size = os.path.getsize(file_path) / (1024 * 1024)
-            print(f"File size: {file_size:.2f}MB")
+            print(f"File size: {file_size / (1024 * 1024):.2f}MB")
             
-            # Upload with proper parameters
-            response = cloudinary.uploader.upload(
-                file_path,
+            # upload_large closes the file once all chunks are sent
+            response = cloudinary.uploader.upload_large(
+                audio_file,
+                filename=f"{public_id.rsplit('/', 1)[-1]}.wav",  # Streams have no name of their own
                 resource_type='video',  # Audio files use 'video' resource type in Cloudinary
                 public_id=f"{folder}/{public_id}",
                 overwrite=True,  # Allow overwriting if same public_id
-                timeout=300  # 5 minutes timeout for large files
+                timeout=300,  # 5 minutes timeout for large files
+                chunk_size=6_000_000  # Cloudinary's minimum chunk size is 5MB
             )
             
             if not response.get('secure_url'):
@@ -328,6 +432,37 @@ class MusicProcessor:
             else:
                 raise Exception(f"Cloudinary upload failed: {error_msg}")
     
+    def _upload_stem(self, stem_name, stem_file, public_id):
+        """
+        Upload a single stem to Cloudinary
+        
+        Args:
+            stem_name: Name of the stem (e.g. 'vocals')
+            stem_file: In-memory WAV file of the stem
+            public_id: Public ID for the stem in Cloudinary
+        
+        Returns:
+            tuple: (stem_name, dict with URL and metadata, or error)
+        """
+        try:
+            # Upload to Cloudinary
+            upload_response = self.upload_to_cloudinary(stem_file, public_id)
+            
+            print(f"✓ Successfully uploaded {stem_name}")
+            return stem_name, {
+                'url': upload_response.get('secure_url'),
+                'public_id': upload_response.get('public_id'),
+                'format': upload_response.get('format'),
+                'size': upload_response.get('bytes')
+            }
+        
+        except Exception as e:
+            print(f"Error uploading stem {stem_name}: {str(e)}")
+            return stem_name, {
+                'url': None,
+                'error': str(e)
+            }
+    
     def process_and_upload(self, audio_file_path, project_id, user_id):
         """
         Complete workflow: process audio and upload all stems to Cloudinary
@@ -340,12 +475,9 @@ class MusicProcessor:
         Returns:
             dict: Results with all stem URLs and metadata
         """
-        import shutil
-        
-        temp_dir = None
         try:
             # Step 1: Process audio
-            stems, temp_dir = self.separate_audio_simple(audio_file_path)
+            stems = self.separate_audio_simple(audio_file_path)
             
             # Step 2: Upload each stem to Cloudinary
             results = {
@@ -354,49 +486,25 @@ class MusicProcessor:
                 'total_stems': len(stems)
             }
             
-            for stem_name, stem_path in stems.items():
-                try:
-                    # Verify file exists before uploading
-                    if not os.path.exists(stem_path):
-                        print(f"Warning: File not found: {stem_path}")
-                        results['stems'][stem_name] = {
-                            'url': None,
-                            'error': f'File not found: {stem_path}'
-                        }
-                        continue
-                    
-                    # Create unique public ID
-                    public_id = f"{user_id}/{project_id}/{stem_name}_{datetime.now().timestamp()}"
-                    
-                    # Upload to Cloudinary
-                    upload_response = self.upload_to_cloudinary(stem_path, public_id)
-                    
-                    results['stems'][stem_name] = {
-                        'url': upload_response.get('secure_url'),
-                        'public_id': upload_response.get('public_id'),
-                        'format': upload_response.get('format'),
-                        'size': upload_response.get('bytes')
-                    }
-                    print(f"✓ Successfully uploaded {stem_name}")
-                    
-                except Exception as e:
-                    print(f"Error uploading stem {stem_name}: {str(e)}")
-                    results['stems'][stem_name] = {
-                        'url': None,
-                        'error': str(e)
-                    }
+            # One timestamp for the whole run, so all stems of an upload share a batch id
+            timestamp = datetime.now().timestamp()
+            batch_id = f"{user_id}/{project_id}"
+            
+            # Uploads are network-bound, so give every stem its own thread
+            with ThreadPoolExecutor(max_workers=max(len(stems), 1)) as executor:
+                futures = [
+                    executor.submit(self._upload_stem, stem_name, stem_file, f"{batch_id}/{stem_name}_{timestamp}")
+                    for stem_name, stem_file in stems.items()
+                ]
+                for future in as_completed(futures):
+                    stem_name, stem_result = future.result()
+                    results['stems'][stem_name] = stem_result
             
             return results
         
         except Exception as e:
             print(f"Error in process_and_upload: {str(e)}")
             raise Exception(f"Processing failed: {str(e)}")
-        
-        finally:
-            # Clean up temporary directory
-            if temp_dir and os.path.exists(temp_dir):
-                print(f"Cleaning up temp directory: {temp_dir}")
-                shutil.rmtree(temp_dir, ignore_errors=True)
     
     def get_audio_duration(self, audio_path):
         """
@@ -409,9 +517,12 @@ class MusicProcessor:
             float: Duration in seconds
         """
         try:
-            y, sr = librosa.load(audio_path, sr=None)
-            duration = librosa.get_duration(y=y, sr=sr)
-            return duration
+            # Read from the file header instead of decoding the whole file
+            try:
+                return sf.info(audio_path).duration
+            except RuntimeError:
+                # Formats libsndfile can't read (e.g. m4a)
+                return librosa.get_duration(path=audio_path)
         except Exception as e:
             print(f"Error getting audio duration: {str(e)}")
             return None